@@ -21,10 +21,16 @@ The curl calls still remain the same, but now in the http://localhost/docs you w
  button where you can copy paste your token. So you will be able to access authenticated methods from the interface.
 """
 
+import base64
+import hashlib
 import re
+import threading
+import time
 
+from cachetools import cached, TLRUCache
 from fastapi import HTTPException
 from flaat.fastapi import Flaat
+import orjson
 
 from ai4papi.conf import MAIN_CONF
 
@@ -33,8 +39,52 @@ from ai4papi.conf import MAIN_CONF
 flaat = Flaat()
 flaat.set_trusted_OP_list(MAIN_CONF["auth"]["OP"])
 
+# Pattern to parse Virtual Organizations from entitlement URNs
+vo_pattern = re.compile(r"group:(.+?):")
+
+
+def token_expiry(token):
+    """
+    Return the expiration time (`exp` claim) of a JWT access token, or infinity if it
+    cannot be read (eg. opaque tokens).
+    The signature is not checked here, as tokens are always validated by the OP.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)  # restore base64 padding
+        return float(orjson.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return float("inf")
+
 
 def get_user_info(token):
+    """
+    Retrieve the user info from the access token.
+
+    We cache the output for 1 minute (or until the token expires, if sooner) to avoid
+    calling the OP on every request. Cache keys are hashes of the tokens, so raw tokens
+    are never stored. This means that a revoked token can remain valid in PAPI for up
+    to 1 minute.
+    Invalid tokens are not cached, as they raise an exception.
+
+    The returned dict is shared between calls, so it should not be modified.
+    """
+    return _get_user_info(token)[0]
+
+
+@cached(
+    cache=TLRUCache(
+        maxsize=4096,
+        ttu=lambda _key, value, now: min(now + 60, value[1]),
+        timer=time.time,  # same clock as the `exp` claim
+    ),
+    key=lambda token: hashlib.blake2b(token.encode(), digest_size=16).hexdigest(),
+    lock=threading.Lock(),
+)
+def _get_user_info(token):
+    """
+    Return the user info along with the token expiration time.
+    """
     try:
         user_infos = flaat.get_user_infos_from_access_token(token)
     except Exception as e:
@@ -57,7 +107,7 @@ def get_user_info(token):
     for i in user_infos.get("eduperson_entitlement", []):
         # Parse Virtual Organizations manually from URNs
         # If more complexity is need in the future, check https://github.com/oarepo/urnparse
-        ent_i = re.search(r"group:(.+?):", i)
+        ent_i = vo_pattern.search(i)
         if ent_i:  # your entitlement has indeed a group `tag`
             vos.append(ent_i.group(1))
 
@@ -76,7 +126,7 @@ def get_user_info(token):
         "vos": vos,
     }
 
-    return out
+    return out, token_expiry(token)
 
 
 def check_vo_membership(
@@ -42,7 +42,8 @@ with open(paths["conf"] / "main.yaml", "r") as f:
 
 def load_nomad_job(fpath):
     """
-    Load default Nomad job configuration
+    Load default Nomad job configuration.
+    Templates are not modified when substituted, so they can be shared without copying.
     """
     with open(fpath, "r") as f:
         raw_job = f.read()
@@ -7,7 +7,7 @@ import fastapi
 import uvicorn
 
 from ai4papi.conf import MAIN_CONF, paths, papi_branch, papi_commit
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from ai4papi.routers import v1
 from ai4papi.routers.v1.stats.deployments import get_cluster_stats_bg
 from fastapi.middleware.cors import CORSMiddleware
@@ -55,6 +55,7 @@ app = fastapi.FastAPI(
     title="AI4EOSC Platform API",
     description=description,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # faster serialization of large responses
 )
 
 app.add_middleware(
@@ -7,6 +7,7 @@ Notes:
  is a Nomad "job" (not a Nomad "deployment"!)
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
 import types
@@ -30,6 +31,61 @@ Nomad.job.get_evaluations = types.MethodType(nomad_patches.get_allocations, Noma
 # Persistent requests session for faster requests
 session = requests.Session()
 
+# Patterns to parse the job info
+host_pattern = re.compile(r"Host\(`(.+?)`")
+deep_start_pattern = re.compile("deep-start --(.*)$")
+
+
+def is_active(
+    url: str,
+):
+    """
+    Check whether an endpoint is reachable.
+    """
+    try:
+        # We use GET and not HEAD, because HEAD is not returning the correct status_codes (even with "allow_redirects=True")
+        # Anyway, both latencies are almost the same when using "allow_redirects=True"
+        # * IDE deployed: GET (200), HEAD (405) | latency: ~90 ms
+        # * API not deployed: GET (502), HEAD (502) | latency: ~40 ms
+        # * Non existing domain: GET (404), HEAD (404) | latency: ~40 ms
+        r = session.get(url, timeout=2)
+        return r.ok
+    except (
+        requests.exceptions.Timeout,
+        requests.exceptions.ConnectionError,
+    ):
+        return False
+
+
+def get_proper_allocation(allocs):
+    """
+    Select the most relevant allocation of a job, and return its ID.
+    """
+    # Select the proper allocation, in a single pass over the allocations.
+    # For each status we keep the most recent allocation.
+    newest = {}  # status --> allocation
+    for a in allocs:
+        for k in (a["ClientStatus"], "any"):
+            if k not in newest or a["CreateTime"] >= newest[k]["CreateTime"]:
+                newest[k] = a
+
+    if "unknown" in newest:
+        # The node has lost connection. Avoid showing temporary reallocated job,
+        # to avoid confusions when the original allocation is restored back again.
+        a = newest["unknown"]
+    elif "running" in newest:
+        # If an allocation is running, return that allocation
+        # It happens that after a network cut, when the network is restored,
+        # the temporary allocation created in the meantime (now with status
+        # 'complete') is more recent than the original allocation that we
+        # recovered (with status 'running'), so using only recency does not work.
+        a = newest["running"]
+    else:
+        # Return most recent allocation
+        a = newest["any"]
+
+    return a["ID"]
+
 
 def get_deployments(
     namespace: str,
@@ -125,7 +181,7 @@ def get_deployment(
         # Iterate through tags to find `Host` tag
         for t in s["Tags"]:
             try:
-                url = re.search(r"Host\(`(.+?)`", t).group(1)
+                url = host_pattern.search(t).group(1)
                 break
             except Exception:
                 url = "missing-endpoint"
@@ -150,10 +206,7 @@ def get_deployment(
         "vscode": "ide",
     }
     try:  # deep-start compatible service
-        service = re.search(
-            "deep-start --(.*)$",
-            info["docker_command"],
-        ).group(1)
+        service = deep_start_pattern.search(info["docker_command"]).group(1)
 
         info["main_endpoint"] = service2endpoint[service]
 
@@ -170,34 +223,7 @@ def get_deployment(
         namespace=namespace,
     )
     if allocs:
-        # Reorder allocations based on recency
-        dates = [a["CreateTime"] for a in allocs]
-        allocs = [
-            x
-            for _, x in sorted(
-                zip(dates, allocs),
-                key=lambda pair: pair[0],
-            )
-        ][::-1]  # more recent first
-
-        # Select the proper allocation
-        statuses = [a["ClientStatus"] for a in allocs]
-        if "unknown" in statuses:
-            # The node has lost connection. Avoid showing temporary reallocated job,
-            # to avoid confusions when the original allocation is restored back again.
-            idx = statuses.index("unknown")
-        elif "running" in statuses:
-            # If an allocation is running, return that allocation
-            # It happens that after a network cut, when the network is restored,
-            # the temporary allocation created in the meantime (now with status
-            # 'complete') is more recent than the original allocation that we
-            # recovered (with status 'running'), so using only recency does not work.
-            idx = statuses.index("running")
-        else:
-            # Return most recent allocation
-            idx = 0
-
-        a = Nomad.allocation.get_allocation(allocs[idx]["ID"])
+        a = Nomad.allocation.get_allocation(get_proper_allocation(allocs))
 
         # Add ID
         info["alloc_ID"] = a["ID"]
@@ -263,23 +289,14 @@ def get_deployment(
             info["endpoints"][k] = v.replace("${meta.domain}", n["Meta"]["domain"])
 
         # Add active endpoints
+        # Endpoints are probed concurrently, so latency is bounded by the slowest one
         if full_info:
-            info["active_endpoints"] = []
-            for k, v in info["endpoints"].items():
-                try:
-                    # We use GET and not HEAD, because HEAD is not returning the correct status_codes (even with "allow_redirects=True")
-                    # Anyway, both latencies are almost the same when using "allow_redirects=True"
-                    # * IDE deployed: GET (200), HEAD (405) | latency: ~90 ms
-                    # * API not deployed: GET (502), HEAD (502) | latency: ~40 ms
-                    # * Non existing domain: GET (404), HEAD (404) | latency: ~40 ms
-                    r = session.get(v, timeout=2)
-                    if r.ok:
-                        info["active_endpoints"].append(k)
-                except (
-                    requests.exceptions.Timeout,
-                    requests.exceptions.ConnectionError,
-                ):
-                    continue
+            urls = list(info["endpoints"].values())
+            with ThreadPoolExecutor(max_workers=max(len(urls), 1)) as executor:
+                active = list(executor.map(is_active, urls))
+            info["active_endpoints"] = [
+                k for k, ok in zip(info["endpoints"].keys(), active) if ok
+            ]
 
         # Disable access to endpoints if there is a network cut
         if info["status"] == "down" and info["active_endpoints"]:
@@ -22,9 +22,11 @@ ref: https://stackoverflow.com/questions/42203673/in-python-why-is-a-tuple-hasha
 This means you cannot name your modules like those names (eg. tags, detail, etc)
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import configparser
 import os
 import re
+import threading
 from typing import Tuple, Union
 import yaml
 
@@ -32,7 +34,6 @@ import ai4_metadata.validate
 from cachetools import cached, TTLCache
 from fastapi import Depends, HTTPException, Query
 from fastapi.security import HTTPBearer
-import requests
 
 from ai4papi import utils
 import ai4papi.conf as papiconf
@@ -42,6 +43,13 @@ security = HTTPBearer()
 
 JENKINS_TOKEN = os.getenv("PAPI_JENKINS_TOKEN")
 
+# Max concurrent metadata requests to Github
+MAX_WORKERS = 16
+
+# Patterns to parse Github repo URLs
+github_org_pattern = re.compile(r"https?:\/\/(www\.)?github\.com\/([^\/]+)\/")
+github_repo_pattern = re.compile(r"github\.com/([^/]+)/([^/]+?)(?:\.git|/)?$")
+
 
 class Catalog:
     def __init__(self, repo: str, item_type: str = "item") -> None:
@@ -53,7 +61,7 @@ class Catalog:
         self.repo = repo
         self.item_type = item_type
 
-    @cached(cache=TTLCache(maxsize=1024, ttl=6 * 60 * 60))
+    @cached(cache=TTLCache(maxsize=1024, ttl=6 * 60 * 60), lock=threading.Lock())
     def get_items(
         self,
     ):
@@ -73,7 +81,13 @@ class Catalog:
         gitmodules_url = (
             f"https://raw.githubusercontent.com/{self.repo}/master/.gitmodules"
         )
-        r = requests.get(gitmodules_url)
+        etag = utils.etags.get(gitmodules_url)
+        headers = {"If-None-Match": etag[0]} if etag else {}
+        r = utils.session.get(gitmodules_url, headers=headers, timeout=utils.TIMEOUT)
+
+        # Catalog has not changed since last time (eg. refresh without new items)
+        if r.status_code == 304:
+            return etag[1]
 
         cfg = configparser.ConfigParser()
         cfg.read_string(r.text)
@@ -91,6 +105,9 @@ class Catalog:
             for tool_name in papiconf.TOOLS.keys() ^ modules.keys():
                 _ = modules.pop(tool_name)
 
+        if r.ok and "ETag" in r.headers:
+            utils.etags[gitmodules_url] = (r.headers["ETag"], modules)
+
         return modules
 
     @cached(cache=TTLCache(maxsize=1024, ttl=6 * 60 * 60))
@@ -128,14 +145,22 @@ class Catalog:
         aren't actually serving any purpose.
         """
         modules = self.get_filtered_list()
-        summary = []
-        ignore = ["description", "links"]  # don't send this info to decrease latency
-        for m in modules:
+
+        def safe_get_metadata(m):
             try:
-                meta1 = self.get_metadata(m)
+                return self.get_metadata(m)
             except Exception:
                 # Avoid breaking the whole method if failing to retrieve a module
                 print(f"Error retrieving metadata: {m}")
+
+        # Retrieve metadata concurrently, so that a cold cache does not take N * 0.3s
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            metadata = list(executor.map(safe_get_metadata, modules))
+
+        summary = []
+        ignore = ["description", "links"]  # don't send this info to decrease latency
+        for m, meta1 in zip(modules, metadata):
+            if meta1 is None:
                 continue
             meta = {k: v for k, v in meta1.items() if k not in ignore}  # filter keys
             meta["name"] = m
@@ -164,6 +189,7 @@ class Catalog:
     @cached(
         cache=TTLCache(maxsize=1024, ttl=7 * 24 * 60 * 60),
         key=lambda self, item_name, **kw: item_name,
+        lock=threading.Lock(),  # metadata is retrieved concurrently in get_summary()
     )
     def _get_metadata(
         self,
@@ -199,7 +225,7 @@ class Catalog:
 
         error = None
         # Try to retrieve the metadata from Github
-        r = requests.get(metadata_url)
+        r = utils.session.get(metadata_url, timeout=utils.TIMEOUT)
         if not r.ok:
             error = (
                 "The metadata of this module could not be retrieved because the "
@@ -231,8 +257,7 @@ class Catalog:
                     )
 
                 # Make sure the repo belongs to one of supported orgs
-                pattern = r"https?:\/\/(www\.)?github\.com\/([^\/]+)\/"
-                match = re.search(pattern, metadata["links"]["source_code"])
+                match = github_org_pattern.search(metadata["links"]["source_code"])
                 github_org = match.group(2) if match else None
                 if not github_org:
                     error = (
@@ -280,12 +305,12 @@ class Catalog:
 
         else:
             # Replace some fields with the info gathered from Github
-            pattern = r"github\.com/([^/]+)/([^/]+?)(?:\.git|/)?$"
-            match = re.search(pattern, items[item_name]["url"])
+            match = github_repo_pattern.search(items[item_name]["url"])
             if match:
                 owner, repo = match.group(1), match.group(2)
                 if force:
-                    utils.get_github_info.cache.pop((owner, repo), None)
+                    with utils.get_github_info.cache_lock:
+                        utils.get_github_info.cache.pop((owner, repo), None)
                 gh_info = utils.get_github_info(owner, repo)
 
                 metadata.setdefault("dates", {})
@@ -342,9 +367,12 @@ class Catalog:
 
         # Refresh metadata
         # We use "force=True" to also refresh Github info
+        # We also expire Docker tags, as a module update usually comes with a new build
         try:
-            self._get_metadata.cache.pop(item_name, None)
+            with self._get_metadata.cache_lock:
+                self._get_metadata.cache.pop(item_name, None)
             self._get_metadata(item_name, force=True)
+            retrieve_docker_tags.cache_clear()
             return {"message": "Cache refreshed successfully"}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
@@ -360,16 +388,20 @@ class Catalog:
         return {}
 
 
+@cached(cache=TTLCache(maxsize=1024, ttl=60 * 60), lock=threading.Lock())
 def retrieve_docker_tags(
     image: str,
     repo: str = "ai4oshub",
 ):
     """
     Retrieve tags from Dockerhub image
+
+    We cache for 1 hour to avoid hitting Dockerhub rate limits. The cache is also
+    expired each time an item's metadata is refreshed.
     """
     url = f"https://registry.hub.docker.com/v2/repositories/{repo}/{image}/tags?page_size=100"
     try:
-        r = requests.get(url)
+        r = utils.session.get(url, timeout=utils.TIMEOUT)
         r.raise_for_status()
         r = r.json()
     except Exception:
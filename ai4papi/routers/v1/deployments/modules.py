@@ -87,9 +87,7 @@ def get_deployments(
             user_jobs.append(job_info)
 
     # Sort deployments by creation date
-    seq = [j["submit_time"] for j in user_jobs]
-    args = sorted(range(len(seq)), key=seq.__getitem__)[::-1]
-    sorted_jobs = [user_jobs[i] for i in args]
+    sorted_jobs = sorted(user_jobs, key=lambda j: j["submit_time"], reverse=True)
 
     return sorted_jobs
 
@@ -175,7 +173,7 @@ def create_deployment(
     auth.check_vo_membership(vo, auth_info["vos"])
 
     # Load module configuration
-    nomad_conf = deepcopy(papiconf.MODULES["nomad"])
+    nomad_conf = papiconf.MODULES["nomad"]
     user_conf = deepcopy(papiconf.MODULES["user"]["values"])
 
     # Update values conf in case we received a submitted conf
@@ -206,8 +204,8 @@ def create_deployment(
         deployments=deployments,
     )
 
-    # Generate UUID from (MAC address+timestamp) so it's unique
-    job_uuid = uuid.uuid1()
+    # Generate a random UUID so it's unique (and does not leak the host MAC address)
+    job_uuid = uuid.uuid4()
 
     # Jobs from tutorial users should have low priority (ie. can be displaced if needed)
     if vo == "training.egi.eu":
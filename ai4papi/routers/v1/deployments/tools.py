@@ -23,6 +23,10 @@ router = APIRouter(
 )
 security = HTTPBearer()
 
+# Patterns to parse the tool name from the job name, and to sanitize job titles
+tool_name_pattern = re.compile(r"tool-(.*?)-[a-f0-9-]{36}")
+title_pattern = re.compile(r'[<>:"/\\|?* ]')
+
 
 @router.get("")
 def get_deployments(
@@ -82,9 +86,7 @@ def get_deployments(
             user_jobs.append(job_info)
 
     # Sort deployments by creation date
-    seq = [j["submit_time"] for j in user_jobs]
-    args = sorted(range(len(seq)), key=seq.__getitem__)[::-1]
-    sorted_jobs = [user_jobs[i] for i in args]
+    sorted_jobs = sorted(user_jobs, key=lambda j: j["submit_time"], reverse=True)
 
     return sorted_jobs
 
@@ -131,7 +133,7 @@ def get_deployment(
 
     # Add an additional field with the tool type
     # We map name from Nomad job to tool ID
-    match = re.search(r"tool-(.*?)-[a-f0-9-]{36}", job["name"])
+    match = tool_name_pattern.search(job["name"])
     nomad_name = match.group(1) if match else ""
     tool_id = papiconf.tools_nomad2id.get(nomad_name, "")
     job["tool_name"] = tool_id
@@ -196,7 +198,7 @@ def create_deployment(
         )
 
     # Load tool configuration
-    nomad_conf = deepcopy(papiconf.TOOLS[tool_name]["nomad"])
+    nomad_conf = papiconf.TOOLS[tool_name]["nomad"]
     user_conf = deepcopy(papiconf.TOOLS[tool_name]["user"]["values"])
 
     # Update values conf in case we received a submitted conf
@@ -218,8 +220,8 @@ def create_deployment(
             item_name=tool_name,
         )
 
-    # Generate UUID from (MAC address+timestamp) so it's unique
-    job_uuid = uuid.uuid1()
+    # Generate a random UUID so it's unique (and does not leak the host MAC address)
+    job_uuid = uuid.uuid4()
 
     # Jobs from tutorial users should have low priority (ie. can be displaced if needed)
     if vo == "training.egi.eu":
@@ -330,8 +332,7 @@ def create_deployment(
             )
 
         # Replace the Nomad job template
-        job_title = re.sub(
-            r'[<>:"/\\|?* ]',
+        job_title = title_pattern.sub(
             "_",
             user_conf["general"]["title"][:45],
         )  # make title foldername-friendly
@@ -2,7 +2,6 @@
 Manage OSCAR clusters to create and execute services.
 """
 
-from copy import deepcopy
 from datetime import datetime
 from functools import wraps
 import json
@@ -119,8 +118,7 @@ def get_client_from_auth(token, vo):
 
 def make_service_definition(svc_conf, vo):
     # Create service definition
-    service = deepcopy(OSCAR_TMPL)  # init from template
-    service = service.safe_substitute(
+    service = OSCAR_TMPL.safe_substitute(
         {
             "CLUSTER_ID": MAIN_CONF["oscar"]["clusters"][vo]["cluster_id"],
             "NAME": svc_conf._name,
@@ -262,7 +260,7 @@ def create_service(
 
     # Assign random UUID to service to avoid clashes
     # We clip it because OSCAR only seems to support names smaller than 39 characters
-    svc_conf._name = f"ai4papi-{uuid.uuid1()}"[:39]
+    svc_conf._name = f"ai4papi-{uuid.uuid4()}"[:39]
 
     # Create service definition
     service_definition = make_service_definition(svc_conf, vo)
@@ -2,9 +2,13 @@
 Manage user secrets with Vault
 """
 
+from http.cookiejar import DefaultCookiePolicy
+
 import hvac
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer
+import requests
+from requests.adapters import HTTPAdapter
 
 from ai4papi import auth
 
@@ -23,6 +27,14 @@ VAULT_AUTH_PATH = "jwt"
 VAULT_ROLE = ""
 VAULT_MOUNT_POINT = "/secrets/"
 
+# Persistent session to keep connections to Vault alive across requests.
+# The session is shared by all users, so it must not hold any state: hvac sends the
+# Vault token as a per-request header, and we refuse to store cookies.
+# Requests are never retried (plain adapter), as they include writes.
+vault_session = requests.Session()
+vault_session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+vault_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=40))
+
 
 def vault_client(jwt, issuer):
     """
@@ -39,6 +51,7 @@ def vault_client(jwt, issuer):
     # Init the Vault client
     client = hvac.Client(
         url=VAULT_ADDR,
+        session=vault_session,
     )
     client.auth.jwt.jwt_login(
         role=VAULT_ROLE,
@@ -7,7 +7,6 @@ The strategy for saving in Harbor is:
   --> labels follow the naming "{NOMAD_UUID_{TIMESTAMP}"
 """
 
-from copy import deepcopy
 import datetime
 from typing import Tuple, Union
 import uuid
@@ -119,7 +118,7 @@ def create_snapshot(
         )
 
     # Load module configuration
-    nomad_conf = deepcopy(papiconf.SNAPSHOTS["nomad"])
+    nomad_conf = papiconf.SNAPSHOTS["nomad"]
 
     # Get target job info
     job_info = nomad_common.get_deployment(
@@ -141,7 +140,7 @@ def create_snapshot(
     now = datetime.datetime.now()
     nomad_conf = nomad_conf.safe_substitute(
         {
-            "JOB_UUID": uuid.uuid1(),
+            "JOB_UUID": uuid.uuid4(),
             "NAMESPACE": papiconf.MAIN_CONF["nomad"]["namespaces"][vo],
             "OWNER": auth_info["id"],
             "OWNER_NAME": auth_info["name"],
@@ -2,6 +2,7 @@
 Return stats from the user/VO/cluster
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import copy
 import csv
 from datetime import datetime, timedelta
@@ -16,6 +17,7 @@ import nomad
 
 from ai4papi import auth
 import ai4papi.conf as papiconf
+import ai4papi.nomad.common as nomad_common
 import ai4papi.nomad.patches as npatches
 
 
@@ -33,6 +35,11 @@ Nomad.job.get_allocations = types.MethodType(npatches.get_allocations, Nomad.job
 
 cluster_stats = None
 
+# Number of concurrent calls to Nomad when computing the cluster stats.
+# We keep it at the size of the default urllib3 connection pool, so that we reuse
+# connections instead of discarding them.
+MAX_WORKERS = 10
+
 
 @cached(cache=TTLCache(maxsize=1024, ttl=6 * 60 * 60))
 def load_stats(
@@ -63,6 +70,15 @@ def load_stats(
 
         with open(pth, "r") as f:
             reader = csv.DictReader(f, delimiter=";")
+
+            # Namespace aggregates are a single row, so they are not lists
+            if name == "full-agg":
+                stats[name] = {
+                    k: v if k in ["date", "owner"] else int(v)
+                    for k, v in next(reader).items()
+                }
+                continue
+
             stats[name] = {k: [] for k in reader.fieldnames}
             for row in reader:
                 for k, v in row.items():
@@ -81,9 +97,6 @@ def load_stats(
     for k, v in stats["timeseries"].items():
         stats["timeseries"][k] = v[idx:]
 
-    # Namespace aggregates are not lists
-    stats["full-agg"] = {k: v[0] for k, v in stats["full-agg"].items()}
-
     return stats
 
 
@@ -125,35 +138,18 @@ def get_user_stats(
     return user_stats
 
 
-def get_proper_allocation(allocs):
-    # Reorder allocations based on recency
-    dates = [a["CreateTime"] for a in allocs]
-    allocs = [
-        x
-        for _, x in sorted(
-            zip(dates, allocs),
-            key=lambda pair: pair[0],
-        )
-    ][::-1]  # more recent first
-
-    # Select the proper allocation
-    statuses = [a["ClientStatus"] for a in allocs]
-    if "unknown" in statuses:
-        # The node has lost connection. Avoid showing temporary reallocated job,
-        # to avoid confusions when the original allocation is restored back again.
-        idx = statuses.index("unknown")
-    elif "running" in statuses:
-        # If an allocation is running, return that allocation
-        # It happens that after a network cut, when the network is restored,
-        # the temporary allocation created in the meantime (now with status
-        # 'complete') is more recent than the original allocation that we
-        # recovered (with status 'running'), so using only recency does not work.
-        idx = statuses.index("running")
-    else:
-        # Return most recent allocation
-        idx = 0
-
-    return allocs[idx]["ID"]
+def get_job_allocation(
+    job_id: str,
+    namespace: str,
+):
+    """
+    Retrieve the proper allocation of a job.
+    """
+    allocs = Nomad.job.get_allocations(
+        id_=job_id,
+        namespace=namespace,
+    )
+    return Nomad.allocation.get_allocation(nomad_common.get_proper_allocation(allocs))
 
 
 @cached(cache=TTLCache(maxsize=1024, ttl=6 * 60 * 60))
@@ -199,48 +195,52 @@ def get_cluster_stats(
         # with uvicorn.
         # So if None, we need to initialize it
         cluster_stats = get_cluster_stats_bg()
-    stats = copy.deepcopy(cluster_stats)
+
+    # Build the output from the shared snapshot without deep-copying it.
+    # Each refresh publishes a new snapshot that is never modified afterwards, so node
+    # stats can be shared; we only create new containers for what we modify
+    # (datacenters, nodes, cluster).
+    stats = {
+        "datacenters": {},
+        "cluster": copy.deepcopy(cluster_stats["cluster"]),
+    }
 
     namespace = papiconf.MAIN_CONF["nomad"]["namespaces"][vo]
 
-    for k, v in stats["datacenters"].copy().items():
+    for k, v in cluster_stats["datacenters"].items():
         # Filter out nodes that do not support the given VO
         nodes = {}
         for n_id, n_stats in v["nodes"].items():
-            if namespace in n_stats["namespaces"]:
-                nodes[n_id] = n_stats
-
-        # Ignore datacenters with no nodes
-        if not nodes:
-            del stats["datacenters"][k]
-        else:
-            stats["datacenters"][k]["nodes"] = nodes
+            if namespace not in n_stats["namespaces"]:
+                continue
+            nodes[n_id] = n_stats
 
-    # Compute cluster stats after node filtering is done
-    for dc_stats in stats["datacenters"].values():
-        for n_stats in dc_stats["nodes"].values():
-            for k, v in n_stats.items():
+            # Aggregate cluster stats in the same pass as node filtering
+            for k1, v1 in n_stats.items():
                 # Ignore keys
-                if k in ["name", "namespaces", "eligibility", "status", "tags"]:
+                if k1 in ["name", "namespaces", "eligibility", "status", "tags"]:
                     continue
 
                 # Aggregate nested gpu_models dict
-                elif k == "gpu_models":
-                    for k1, v1 in v.items():
-                        model_stats = stats["cluster"]["gpu_models"].get(
-                            k1,
+                elif k1 == "gpu_models":
+                    for k2, v2 in v1.items():
+                        model_stats = stats["cluster"]["gpu_models"].setdefault(
+                            k2,
                             {
                                 "gpu_total": 0,
                                 "gpu_used": 0,
                             },  # init value
                         )
-                        for k2, v2 in v1.items():
-                            model_stats[k2] += v2
-                        stats["cluster"]["gpu_models"][k1] = model_stats
+                        for k3, v3 in v2.items():
+                            model_stats[k3] += v3
 
                 # Aggregate other resources
                 else:
-                    stats["cluster"][k] += v
+                    stats["cluster"][k1] += v1
+
+        # Ignore datacenters with no nodes
+        if nodes:
+            stats["datacenters"][k] = {**v, "nodes": nodes}
 
     return stats
 
@@ -264,7 +264,9 @@ def get_cluster_stats_bg():
         "disk_total",
         "disk_used",
     ]
-    datacenters = load_datacenters()  # available datacenters info
+    # Copy the cached datacenters info, so that each refresh builds a new snapshot
+    # instead of modifying the one currently published in `cluster_stats`
+    datacenters = copy.deepcopy(load_datacenters())  # available datacenters info
     stats = {
         "datacenters": datacenters,  # aggregated datacenter usage
         "cluster": {k: 0 for k in resources},  # aggregated cluster usage
@@ -275,9 +277,12 @@ def get_cluster_stats_bg():
     nodes = Nomad.nodes.get_nodes(resources=True)
     nodes_dc = {}  # dict(node, datacenter)
 
+    # Retrieve full node info concurrently, as those calls are independent
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        nodes_info = list(executor.map(Nomad.node.get_node, [n["ID"] for n in nodes]))
+
     # Get total stats for each node
-    for n in nodes:
-        node = Nomad.node.get_node(n["ID"])
+    for n, node in zip(nodes, nodes_info):
         n_stats = {k: 0 for k in resources}
         n_stats["name"] = node["Name"]
         n_stats["eligibility"] = node["SchedulingEligibility"]
@@ -323,62 +328,58 @@ def get_cluster_stats_bg():
     # Get aggregated usage stats for each node
     namespaces = ["default"] + list(papiconf.MAIN_CONF["nomad"]["namespaces"].values())
 
+    running = []  # list of (job, namespace)
     for namespace in namespaces:
         jobs = Nomad.jobs.get_jobs(namespace=namespace, filter_='Status == "running"')
-        for j in jobs:
-            # Retrieve full job for meta
-            job = Nomad.job.get_job(
-                id_=j["ID"],
-                namespace=namespace,
-            )
+        running += [(j, namespace) for j in jobs]
 
-            allocs = Nomad.job.get_allocations(
-                id_=job["ID"],
-                namespace=namespace,
-            )
+    # Retrieve the proper allocations of the jobs concurrently
+    # (the job name is already available in the jobs list, no need to retrieve the job)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        allocs = list(
+            executor.map(lambda x: get_job_allocation(x[0]["ID"], x[1]), running)
+        )
 
-            # Keep the proper allocation
-            a = Nomad.allocation.get_allocation(get_proper_allocation(allocs))
-
-            # Add resources
-            datacenter = nodes_dc[a["NodeID"]]
-            n_stats = stats["datacenters"][datacenter]["nodes"][a["NodeID"]]
-
-            # TODO: we are ignoring resources consumed by other jobs
-            if job["Name"].startswith("module") or job["Name"].startswith("tool"):
-                n_stats["jobs_num"] += 1
-
-            # TODO: we are ignoring resources consumed by other tasks
-            if "main" in a["AllocatedResources"]["Tasks"]:
-                res = a["AllocatedResources"]["Tasks"]["main"]
-
-                # cpu
-                if res["Cpu"]["ReservedCores"]:
-                    n_stats["cpu_used"] += len(res["Cpu"]["ReservedCores"])
-
-                # ram
-                n_stats["ram_used"] += res["Memory"]["MemoryMB"]
-
-                # disk
-                # Note: In theory we can get the total disk used in a node looking at the
-                # metadata (ie. "unique.storage.bytesfree"). But that gave us the disk that
-                # is actually used. But we are instead interested on the disk that is reserved
-                # by users (regardless of whether they are actually using it).
-                n_stats["disk_used"] += a["AllocatedResources"]["Shared"]["DiskMB"]
-
-                # gpu
-                if res["Devices"]:
-                    gpu = [d for d in res["Devices"] if d["Type"] == "gpu"][0]
-                    gpu_num = len(gpu["DeviceIDs"]) if gpu else 0
-
-                    # Sometimes the node fails and GPUs are not detected [1].
-                    # In that case, avoid counting that GPU in the stats.
-                    # [1]: https://docs.ai4os.eu/en/latest/user/others/faq.html#my-gpu-just-disappeared-from-my-deployment
-                    if n_stats["gpu_models"]:
-                        n_stats["gpu_used"] += gpu_num
-                        n_stats["gpu_models"][gpu["Name"]]["gpu_used"] += gpu_num
-            else:
-                continue
+    for (job, _), a in zip(running, allocs):
+        # Add resources
+        datacenter = nodes_dc[a["NodeID"]]
+        n_stats = stats["datacenters"][datacenter]["nodes"][a["NodeID"]]
+
+        # TODO: we are ignoring resources consumed by other jobs
+        if job["Name"].startswith(("module", "tool")):
+            n_stats["jobs_num"] += 1
+
+        # TODO: we are ignoring resources consumed by other tasks
+        if "main" in a["AllocatedResources"]["Tasks"]:
+            res = a["AllocatedResources"]["Tasks"]["main"]
+
+            # cpu
+            if res["Cpu"]["ReservedCores"]:
+                n_stats["cpu_used"] += len(res["Cpu"]["ReservedCores"])
+
+            # ram
+            n_stats["ram_used"] += res["Memory"]["MemoryMB"]
+
+            # disk
+            # Note: In theory we can get the total disk used in a node looking at the
+            # metadata (ie. "unique.storage.bytesfree"). But that gave us the disk that
+            # is actually used. But we are instead interested on the disk that is reserved
+            # by users (regardless of whether they are actually using it).
+            n_stats["disk_used"] += a["AllocatedResources"]["Shared"]["DiskMB"]
+
+            # gpu
+            if res["Devices"]:
+                gpu = [d for d in res["Devices"] if d["Type"] == "gpu"][0]
+                gpu_num = len(gpu["DeviceIDs"]) if gpu else 0
+
+                # Sometimes the node fails and GPUs are not detected [1].
+                # In that case, avoid counting that GPU in the stats.
+                # [1]: https://docs.ai4os.eu/en/latest/user/others/faq.html#my-gpu-just-disappeared-from-my-deployment
+                if n_stats["gpu_models"]:
+                    n_stats["gpu_used"] += gpu_num
+                    n_stats["gpu_models"][gpu["Name"]]["gpu_used"] += gpu_num
+        else:
+            continue
 
     # Keep ineligible nodes, but set (used=total) for all resources
     # We don't remove the node altogether because jobs might still be running there
@@ -2,13 +2,13 @@
 Misc utilities regarding AI4OS compatible storages.
 """
 
-import json
 import os
 import subprocess
 import types
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer
+import orjson
 
 from ai4papi import auth
 from ai4papi.routers.v1 import secrets as ai4secrets
@@ -24,8 +24,8 @@ security = HTTPBearer()
 
 def run_clone(command, storage_name, vo, token):
     """
-    Run an RCLONE command, setting the appropriate configuration based on the user
-    secrets stored in Vault.
+    Run an RCLONE command (as a list of arguments), setting the appropriate
+    configuration based on the user secrets stored in Vault.
     """
     # Retrieve the rclone credentials
     secrets = ai4secrets.get_secrets(
@@ -42,30 +42,54 @@ def run_clone(command, storage_name, vo, token):
             detail="Invalid storage name.",
         )
 
-    # Use rclone to delete the subpath
-    result = subprocess.run(
-        [
-            f"export RCLONE_CONFIG_RSHARE_VENDOR={storage['vendor']} && "
-            f"export RCLONE_CONFIG_RSHARE_URL={storage['server']}/remote.php/dav/files/{storage['loginName']} && "
-            "export RCLONE_CONFIG_RSHARE_TYPE=webdav && "
-            f"export RCLONE_CONFIG_RSHARE_USER={storage['loginName']} && "
-            f"export RCLONE_CONFIG_RSHARE_PASS={storage['appPassword']} && "
-            "export RCLONE_CONFIG_RSHARE_PASS=$(rclone obscure $RCLONE_CONFIG_RSHARE_PASS) && "
-            f"{command} ;"
-            "status=$? ;"  # we want to return the status code of the RCLONE command
-            "for var in $(env | grep '^RCLONE_CONFIG_RSHARE_' | awk -F= '{print $1}'); do unset $var; done;"
-            "exit $status"
-        ],
-        shell=True,
-        capture_output=True,
-        text=True,
-    )
+    # Obscure the password, passing it via stdin to keep it out of the process list
+    try:
+        obscured = subprocess.run(
+            ["rclone", "obscure", "-"],
+            input=storage["appPassword"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error running the RCLONE command. \n\n {e}",
+        )
+    if obscured.returncode != 0:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error obscuring the RCLONE password. \n\n {obscured.stderr}",
+        )
+
+    # Run the RCLONE command
+    # We pass the configuration as environment variables of the child process only, so
+    # no shell is needed and the credentials never reach the PAPI environment
+    env = {
+        **os.environ,
+        "RCLONE_CONFIG_RSHARE_TYPE": "webdav",
+        "RCLONE_CONFIG_RSHARE_VENDOR": storage["vendor"],
+        "RCLONE_CONFIG_RSHARE_URL": f"{storage['server']}/remote.php/dav/files/{storage['loginName']}",
+        "RCLONE_CONFIG_RSHARE_USER": storage["loginName"],
+        "RCLONE_CONFIG_RSHARE_PASS": obscured.stdout.strip(),
+    }
+    # Output is kept as bytes, as it is faster to parse with orjson
+    try:
+        result = subprocess.run(
+            command,
+            env=env,
+            capture_output=True,
+        )
+    except OSError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error running the RCLONE command. \n\n {e}",
+        )
 
     # Check for possible errors
     if result.returncode != 0:
         raise HTTPException(
             status_code=500,
-            detail=f"Error running the RCLONE command. \n\n {result.stderr}",
+            detail=f"Error running the RCLONE command. \n\n {result.stderr.decode()}",
         )
 
     return result
@@ -100,7 +124,7 @@ def storage_ls(
 
         # Run RCLONE command
         result = run_clone(
-            command=f"rclone lsjson rshare:/{subpath}",
+            command=["rclone", "lsjson", f"rshare:/{subpath}"],
             storage_name=storage_name,
             vo=vo,
             token=authorization.credentials,
@@ -108,12 +132,12 @@ def storage_ls(
 
         # Parse the JSON output
         try:
-            json_output = json.loads(result.stdout)
+            json_output = orjson.loads(result.stdout)
             return json_output
         except Exception:
             raise HTTPException(
                 status_code=500,
-                detail=f"Error retrieving information from storage. \n\n {result.stderr}",
+                detail=f"Error retrieving information from storage. \n\n {result.stderr.decode()}",
             )
 
 
@@ -153,7 +177,7 @@ def storage_rm(
 
         # Run RCLONE command
         _ = run_clone(
-            command=f"rclone purge rshare:/{subpath}",
+            command=["rclone", "purge", f"rshare:/{subpath}"],
             storage_name=storage_name,
             vo=vo,
             token=authorization.credentials,
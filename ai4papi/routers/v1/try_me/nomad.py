@@ -3,10 +3,14 @@ This route is meant to be public for everyone authenticated to try (no VO member
 required). We deploy jobs by default in the AI4EOSC namespace.
 """
 
-from copy import deepcopy
-import types
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import uuid
+import weakref
 
+from cachetools import cached, TTLCache
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPBearer
 
@@ -28,6 +32,103 @@ security = HTTPBearer()
 VO = "vo.ai4eosc.eu"
 NAMESPACE = papiconf.MAIN_CONF["nomad"]["namespaces"][VO]
 
+# Number of concurrent calls to Nomad when retrieving the user deployments.
+# We keep it at the size of the default urllib3 connection pool.
+MAX_WORKERS = 10
+
+# Per-user locks for try-me creation (user ID --> lock)
+# Locks are only referenced while in use, so entries of idle users are dropped
+user_locks = weakref.WeakValueDictionary()
+user_locks_lock = threading.Lock()
+
+# Max try-me creation requests per user, in a sliding time window (seconds)
+RATE_LIMIT = 10
+RATE_WINDOW = 60
+rate_requests = {}  # user ID --> deque of request timestamps
+rate_lock = threading.Lock()
+
+
+def check_rate_limit(
+    authorization=Depends(security),
+):
+    """
+    Reject users that request too many try-me deployments in a short time, before
+    doing any work for them.
+    """
+    auth_info = auth.get_user_info(token=authorization.credentials)
+    now = time.monotonic()
+    with rate_lock:
+        # Forget users without recent requests, to keep memory bounded
+        for k in [k for k, v in rate_requests.items() if v[-1] < now - RATE_WINDOW]:
+            del rate_requests[k]
+
+        # Drop requests outside the window
+        timestamps = rate_requests.setdefault(auth_info["id"], collections.deque())
+        while timestamps and timestamps[0] < now - RATE_WINDOW:
+            timestamps.popleft()
+
+        if len(timestamps) >= RATE_LIMIT:
+            raise HTTPException(
+                status_code=429,
+                detail="Sorry, but you have made too many `try-me` requests in a "
+                "short time. Please try later.",
+            )
+        timestamps.append(now)
+
+
+@cached(cache=TTLCache(maxsize=1, ttl=15), lock=threading.Lock())
+def get_tryme_resources():
+    """
+    Aggregate the resources (used and total) of the nodes dedicated to try-me jobs.
+
+    We cache it for a short period because this is checked on every try-me creation
+    and resources do not vary that much in a few seconds.
+    """
+    stats = get_cluster_stats(vo=VO)
+    cpu_used = ram_used = disk_used = 0
+    cpu_total = ram_total = disk_total = 0
+
+    for datacenter in stats["datacenters"].values():
+        for node in datacenter["nodes"].values():
+            if "tryme" in node["tags"] and node["status"] == "ready":
+                cpu_used += node["cpu_used"]
+                ram_used += node["ram_used"]
+                disk_used += node["disk_used"]
+                cpu_total += node["cpu_total"]
+                ram_total += node["ram_total"]
+                disk_total += node["disk_total"]
+
+    status = {
+        "cpu_used": cpu_used,
+        "ram_used": ram_used,
+        "disk_used": disk_used,
+        "cpu_total": cpu_total,
+        "ram_total": ram_total,
+        "disk_total": disk_total,
+    }
+    return status
+
+
+def retrieve_deployment(
+    deployment_uuid: str,
+    owner: str,
+    full_info: bool,
+):
+    """
+    Retrieve a try-me deployment from Nomad, with the UI as main endpoint.
+    """
+    job = nomad.get_deployment(
+        deployment_uuid=deployment_uuid,
+        namespace=NAMESPACE,
+        owner=owner,
+        full_info=full_info,
+    )
+
+    # Rewrite main endpoint, otherwise it automatically selects DEEPaaS API
+    job["main_endpoint"] = "ui"
+
+    return job
+
 
 @router.get("")
 def get_deployments(
@@ -53,27 +154,25 @@ def get_deployments(
         owner=auth_info["id"],
         prefix="try",
     )
-    user_jobs = []
-    for j in jobs:
+
+    def safe_get_deployment(j):
+        # We reuse the already retrieved auth info, instead of calling the
+        # `get_deployment()` route, that would authenticate again for each job
         try:
-            job_info = get_deployment(
+            return retrieve_deployment(
                 deployment_uuid=j["ID"],
+                owner=auth_info["id"],
                 full_info=full_info,
-                authorization=types.SimpleNamespace(
-                    credentials=authorization.credentials  # token
-                ),
             )
         except HTTPException:  # not a try-me
-            continue
-        except Exception as e:  # unexpected error
-            raise (e)
+            return None
 
-        user_jobs.append(job_info)
+    # Retrieve the jobs info concurrently
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        user_jobs = [j for j in executor.map(safe_get_deployment, jobs) if j]
 
     # Sort deployments by creation date
-    seq = [j["submit_time"] for j in user_jobs]
-    args = sorted(range(len(seq)), key=seq.__getitem__)[::-1]
-    sorted_jobs = [user_jobs[i] for i in args]
+    sorted_jobs = sorted(user_jobs, key=lambda j: j["submit_time"], reverse=True)
 
     return sorted_jobs
 
@@ -97,20 +196,14 @@ def get_deployment(
     # Retrieve authenticated user info
     auth_info = auth.get_user_info(token=authorization.credentials)
 
-    job = nomad.get_deployment(
+    return retrieve_deployment(
         deployment_uuid=deployment_uuid,
-        namespace=NAMESPACE,
         owner=auth_info["id"],
         full_info=full_info,
     )
 
-    # Rewrite main endpoint, otherwise it automatically selects DEEPaaS API
-    job["main_endpoint"] = "ui"
-
-    return job
-
 
-@router.post("")
+@router.post("", dependencies=[Depends(check_rate_limit)])
 def create_deployment(
     module_name: str,
     title: str = Query(default=""),
@@ -125,78 +218,86 @@ def create_deployment(
     # Retrieve authenticated user info
     auth_info = auth.get_user_info(token=authorization.credentials)
 
-    # Retrieve docker_image from module_name
-    meta = Modules.get_metadata(module_name)
-    registry = meta["links"]["docker_image"]
-    docker_image = "/".join(registry.split("/")[-2:])
-
-    # Load module configuration
-    nomad_conf = deepcopy(papiconf.TRY_ME["nomad"])
-
-    # Generate UUID from (MAC address+timestamp) so it's unique
-    job_uuid = uuid.uuid1()
-
-    # Replace the Nomad job template
-    nomad_conf = nomad_conf.safe_substitute(
-        {
-            "JOB_UUID": job_uuid,
-            "NAMESPACE": NAMESPACE,
-            "TITLE": title[:45],
-            "OWNER": auth_info["id"],
-            "OWNER_NAME": auth_info["name"],
-            "OWNER_EMAIL": auth_info["email"],
-            "BASE_DOMAIN": papiconf.MAIN_CONF["lb"]["domain"][VO],
-            "HOSTNAME": job_uuid,
-            "DOCKER_IMAGE": docker_image,
-        }
-    )
-
-    # Convert template to Nomad conf
-    nomad_conf = nomad.load_job_conf(nomad_conf)
-
-    # Check that the target node (ie. tag='tryme') resources are available because
-    # these jobs cannot be left queueing
-    # We check for every resource metric (cpu, disk, ram)
-    stats = get_cluster_stats(vo=VO)
-    resources = ["cpu", "ram", "disk"]
-    keys = [f"{i}_used" for i in resources] + [f"{i}_total" for i in resources]
-    status = {k: 0 for k in keys}
-
-    for _, datacenter in stats["datacenters"].items():
-        for _, node in datacenter["nodes"].items():
-            if "tryme" in node["tags"] and node["status"] == "ready":
-                for k in keys:
-                    status[k] += node[k]
-    for r in resources:
-        if (
-            status[f"{r}_total"] == 0
-            or status[f"{r}_used"] / status[f"{r}_total"] > 0.85
-        ):
-            # We cut of somehow earlier than 100% because we are only accounting for
-            # cores consumed in "main" task. But UI task is also consuming resources.
+    # Checking the user's running jobs and submitting the new one is done under a
+    # per-user lock, so that concurrent requests cannot bypass the limit of try-me jobs
+    with user_locks_lock:
+        user_lock = user_locks.setdefault(auth_info["id"], threading.Lock())
+
+    with user_lock:
+        # Retrieve the try-me resources and the user's try-me jobs concurrently, as
+        # both are independent calls to Nomad
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            status_future = executor.submit(get_tryme_resources)
+            jobs_future = executor.submit(
+                nomad.get_deployments,
+                namespace=NAMESPACE,
+                owner=auth_info["id"],
+                prefix="try",
+            )
+        status = status_future.result()
+        jobs = jobs_future.result()
+
+        # Check that the target node (ie. tag='tryme') resources are available
+        # because these jobs cannot be left queueing
+        # We check for every resource metric (cpu, disk, ram)
+        for r in ["cpu", "ram", "disk"]:
+            if (
+                status[f"{r}_total"] == 0
+                or status[f"{r}_used"] / status[f"{r}_total"] > 0.85
+            ):
+                # We cut of somehow earlier than 100% because we are only accounting
+                # for cores consumed in "main" task. But UI task is also consuming
+                # resources.
+                raise HTTPException(
+                    status_code=503,
+                    detail="Sorry, but there seem to be no resources available right "
+                    "now to test the module. Please try later.",
+                )
+
+        # Check that the user hasn't too many "try-me" jobs currently running
+        if len(jobs) >= 3:
             raise HTTPException(
                 status_code=503,
-                detail="Sorry, but there seem to be no resources available right "
-                "now to test the module. Please try later.",
+                detail="Sorry, but you seem to be currently running 3 `try-me` environments already. "
+                "Before launching a new one, you will need to wait till one of your "
+                "existing environments gets automatically deleted (ca. 10 min) or delete it manually "
+                "in the Dashboard.",
             )
 
-    # Check that the user hasn't too many "try-me" jobs currently running
-    jobs = nomad.get_deployments(
-        namespace=NAMESPACE,
-        owner=auth_info["id"],
-        prefix="try",
-    )
-    if len(jobs) >= 3:
-        raise HTTPException(
-            status_code=503,
-            detail="Sorry, but you seem to be currently running 3 `try-me` environments already. "
-            "Before launching a new one, you will need to wait till one of your "
-            "existing environments gets automatically deleted (ca. 10 min) or delete it manually "
-            "in the Dashboard.",
+        # Only prepare the job once we know it can be submitted, so that we avoid
+        # retrieving metadata and parsing the job when the checks fail
+
+        # Retrieve docker_image from module_name
+        meta = Modules.get_metadata(module_name)
+        registry = meta["links"]["docker_image"]
+        docker_image = "/".join(registry.split("/")[-2:])
+
+        # Load module configuration
+        nomad_conf = papiconf.TRY_ME["nomad"]
+
+        # Generate a random UUID so it's unique (and does not leak the host MAC)
+        job_uuid = uuid.uuid4()
+
+        # Replace the Nomad job template
+        nomad_conf = nomad_conf.safe_substitute(
+            {
+                "JOB_UUID": job_uuid,
+                "NAMESPACE": NAMESPACE,
+                "TITLE": title[:45],
+                "OWNER": auth_info["id"],
+                "OWNER_NAME": auth_info["name"],
+                "OWNER_EMAIL": auth_info["email"],
+                "BASE_DOMAIN": papiconf.MAIN_CONF["lb"]["domain"][VO],
+                "HOSTNAME": job_uuid,
+                "DOCKER_IMAGE": docker_image,
+            }
         )
 
-    # Submit job
-    r = nomad.create_deployment(nomad_conf)
+        # Convert template to Nomad conf
+        nomad_conf = nomad.load_job_conf(nomad_conf)
+
+        # Submit job
+        r = nomad.create_deployment(nomad_conf)
 
     return r
 
@@ -2,49 +2,84 @@
 Miscellaneous utils
 """
 
-from datetime import datetime
-import json
 from pathlib import Path
 import os
 import re
+import threading
 
 from cachetools import cached, TTLCache, LRUCache
 from fastapi import HTTPException
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import ai4papi.conf as papiconf
 
 
 # Persistent requests session for faster requests
+# We retry on rate-limiting/transient errors, but we return the last response instead
+# of raising, so that callers can keep checking `r.ok`.
+# We ignore the Retry-After header (only use our short backoff), because these calls
+# run inside sync routes and an upstream could otherwise hold worker threads for
+# minutes. For the same reason, calls using this session should pass `timeout=TIMEOUT`.
+# The pool is sized so that concurrent requests (FastAPI runs sync routes in a
+# 40-thread pool, plus the catalog summary workers) can all reuse a connection.
 session = requests.Session()
+adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "HEAD"}),  # only retry reads
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    ),
+)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+TIMEOUT = (5, 30)  # seconds (connect, read)
 
 # Retrieve tokens for better rate limit
 github_token = os.environ.get("PAPI_GITHUB_TOKEN", None)
 
+# Last ETag and parsed content of some URLs, to make conditional requests
+# (304 responses are empty and do not count against the Github API rate limit)
+etags = {}  # url --> (etag, content)
+
+# Patterns to validate DOIs and URLs of datasets
+# ref: https://stackoverflow.com/a/48524047/18471590
+doi_pattern = re.compile(r"^10.\d{4,9}/[-._;()/:A-Z0-9]+$", re.IGNORECASE)
+url_pattern = re.compile(
+    r"https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)",
+    re.IGNORECASE,
+)
+
 
 def update_values_conf(submitted, reference):
     """
     Update the reference YAML values configuration with a user submitted ones.
     We also check that the submitted conf has the appropriate keys.
     """
-    for k in submitted.keys():
+    for k, v in submitted.items():
         # Check level 1 keys
-        if k not in reference.keys():
+        if k not in reference:
             raise HTTPException(
                 status_code=400, detail=f"The key `{k}` in not a valid parameter."
             )
 
         # Check level 2 keys
-        s1 = set(submitted[k].keys())
-        s2 = set(reference[k].keys())
-        subs = s1.difference(s2)
+        subs = v.keys() - reference[k].keys()
         if subs:
             raise HTTPException(
                 status_code=400, detail=f"The keys `{subs}` are not a valid parameters."
             )
 
-        # Update with user values
-        reference[k].update(submitted[k])
+    # Update with user values, once everything has been validated
+    for k, v in submitted.items():
+        reference[k].update(v)
 
     return reference
 
@@ -73,13 +108,7 @@ def validate_conf(conf):
     if datasets:
         for d in datasets:
             # Validate DOI and URL
-            # ref: https://stackoverflow.com/a/48524047/18471590
-            doiPattern = r"^10.\d{4,9}/[-._;()/:A-Z0-9]+$"
-            urlPattern = r"https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)"
-            if not (
-                re.match(doiPattern, d["doi"], re.IGNORECASE)
-                or re.match(urlPattern, d["doi"], re.IGNORECASE)
-            ):
+            if not (doi_pattern.match(d["doi"]) or url_pattern.match(d["doi"])):
                 raise HTTPException(status_code=400, detail="Invalid DOI or URL.")
 
             # Check force pull parameter
@@ -91,7 +120,10 @@ def validate_conf(conf):
     return conf
 
 
-@cached(cache=TTLCache(maxsize=1024, ttl=30 * 7 * 24 * 60 * 60))
+@cached(
+    cache=TTLCache(maxsize=1024, ttl=30 * 7 * 24 * 60 * 60),
+    lock=threading.Lock(),  # called concurrently when retrieving the catalog summary
+)
 def get_github_info(owner, repo):
     """
     Retrieve information from a Github repo
@@ -108,30 +140,25 @@ def get_github_info(owner, repo):
     # Retrieve information from Github API
     url = f"https://api.github.com/repos/{owner}/{repo}"
     headers = {"Authorization": f"token {github_token}"} if github_token else {}
-    r = session.get(url, headers=headers)
+    if url in etags:
+        headers["If-None-Match"] = etags[url][0]
+    r = session.get(url, headers=headers, timeout=TIMEOUT)
+
+    # Repo info has not changed since last time
+    if r.status_code == 304:
+        return etags[url][1]
 
     # Parse the information
     out = {}
     if r.ok:
-        repo_data = r.json()
-        out["created"] = (
-            datetime.strptime(
-                repo_data["created_at"],
-                "%Y-%m-%dT%H:%M:%SZ",
-            )
-            .date()
-            .strftime("%Y-%m-%d")
-        )  # keep only the date
-        out["updated"] = (
-            datetime.strptime(
-                repo_data["updated_at"],
-                "%Y-%m-%dT%H:%M:%SZ",
-            )
-            .date()
-            .strftime("%Y-%m-%d")
-        )
+        repo_data = orjson.loads(r.content)
+        # Dates are in ISO format (eg. "2024-01-31T10:00:00Z"), keep only the date
+        out["created"] = repo_data["created_at"][:10]
+        out["updated"] = repo_data["updated_at"][:10]
         out["license"] = (repo_data["license"] or {}).get("spdx_id", "")
         # out['stars'] = repo_data['stargazers_count']
+        if "ETag" in r.headers:
+            etags[url] = (r.headers["ETag"], out)
     else:
         msg = "API rate limit exceeded" if r.status_code == 403 else ""
         print(f"  [Error] Failed to parse Github repo info: {msg}")
@@ -139,19 +166,78 @@ def get_github_info(owner, repo):
     return out
 
 
-@cached(cache=LRUCache(maxsize=20))
+# Max number of snapshots whose running job IDs are kept in memory. We only keep the
+# IDs (not the full job info), so this costs a few KB per snapshot. Lookups are
+# usually for recent deployments, so the most recent snapshots are the ones that
+# stay cached.
+MAX_CACHED_SNAPSHOTS = 500
+
+
+def parse_snapshot(
+    snapshot_pth: Path,
+):
+    """
+    Return the running jobs of a snapshot (job_ID --> job info).
+    """
+    with open(snapshot_pth, "rb") as f:
+        snapshot = orjson.loads(f.read())
+
+    jobs = {}
+    for namespace, ns_jobs in snapshot.items():
+        for job in ns_jobs:
+            if job["status"] != "running" or job["job_ID"] in jobs:
+                continue
+            job["namespace"] = namespace
+            job["alloc_end"] = (
+                f"{snapshot_pth.stem}0000Z"  # the end date is approximate (true value lies between this snapshot date and next one)
+            )
+            jobs[job["job_ID"]] = job
+
+    return jobs
+
+
+@cached(cache=LRUCache(maxsize=MAX_CACHED_SNAPSHOTS), lock=threading.Lock())
+def snapshot_job_ids(
+    snapshot_pth: Path,
+):
+    """
+    Return the IDs of the running jobs of a snapshot.
+    The lock only protects the cache, so snapshots are parsed concurrently.
+    """
+    return frozenset(parse_snapshot(snapshot_pth))
+
+
+def iter_snapshots(root):
+    """
+    Yield the snapshot paths, from recent to old.
+    Snapshot names are dates, so we walk each folder in reverse name order. This
+    avoids listing and sorting the full snapshot tree when the deployment is recent.
+    """
+    try:
+        with os.scandir(root) as it:
+            entries = sorted(it, key=lambda e: e.name, reverse=True)
+    except FileNotFoundError:
+        return
+
+    for e in entries:
+        if e.is_dir():
+            yield from iter_snapshots(e.path)
+        elif e.name.endswith(".json"):
+            yield Path(e.path)
+
+
+@cached(cache=LRUCache(maxsize=20), lock=threading.Lock())
 def retrieve_from_snapshots(
     deployment_uuid: str,
 ):
     """
     Retrieve the deployment info from Nomad periodic snapshots.
 
-    This implementation is ugly as hell (iterate through all JSONs). Hopefully
-    after refactoring the "ai4-accounting" repo we will implement something cleaner
-    (eg. database).
-
-    Anyway, not a big concern because this function is not meant to be called very
-    frequently and latency from reading JSONs is very small.
+    We go through the snapshots from recent to old and stop at the first one where
+    the deployment was running. The running job IDs of each snapshot are cached (see
+    `snapshot_job_ids`).
+    Hopefully after refactoring the "ai4-accounting" repo we will implement something
+    cleaner (eg. database).
     """
     main_dir = os.environ.get("ACCOUNTING_PTH", None)
     if not main_dir:
@@ -162,20 +248,10 @@ def retrieve_from_snapshots(
     snapshot_dir = Path(main_dir) / "snapshots"
 
     # Iterate over snapshots, from recent to old
-    for snapshot_pth in sorted(snapshot_dir.glob("**/*.json"))[::-1]:
-        # Load the snapshot
-        with open(snapshot_pth, "r") as f:
-            snapshot = json.load(f)
-
-        # Iterate over deployments until we find the correct one
-        for namespace, jobs in snapshot.items():
-            for job in jobs:
-                if (job["job_ID"] == deployment_uuid) and (job["status"] == "running"):
-                    job["namespace"] = namespace
-                    job["alloc_end"] = (
-                        f"{snapshot_pth.stem}0000Z"  # the end date is approximate (true value lies between this snapshot date and next one)
-                    )
-                    return job
+    for snapshot_pth in iter_snapshots(snapshot_dir):
+        if deployment_uuid in snapshot_job_ids(snapshot_pth):
+            # Only the matching snapshot is parsed again to retrieve the job info
+            return parse_snapshot(snapshot_pth)[deployment_uuid]
 
     # If no deployment found, show error
     raise HTTPException(
@@ -189,5 +265,14 @@ def ai4life_catalog():
     Load the AI4Life catalog, after filtering the models that AI4EOSC can support.
     """
     url = "https://raw.githubusercontent.com/ai4os/ai4os-ai4life-loader/refs/heads/main/models/filtered_models.json"
-    response = requests.get(url)
-    return response.json()
+    headers = {"If-None-Match": etags[url][0]} if url in etags else {}
+    r = session.get(url, headers=headers, timeout=TIMEOUT)
+
+    # Catalog has not changed since last time
+    if r.status_code == 304:
+        return etags[url][1]
+
+    catalog = orjson.loads(r.content)
+    if "ETag" in r.headers:
+        etags[url] = (r.headers["ETag"], catalog)
+    return catalog
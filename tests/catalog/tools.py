@@ -1,22 +1,10 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
 from types import SimpleNamespace
 
 from ai4papi.routers.v1.catalog import common
 from ai4papi.routers.v1.catalog.tools import Tools
 
 
-# Retrieve EGI token (not generated on the fly in case the are rate limiting issues
-# if too many queries)
-token = os.getenv("TMP_EGI_TOKEN")
-if not token:
-    raise Exception(
-        'Please remember to set a token as ENV variable before executing \
-the tests! \n\n \
-   export TMP_EGI_TOKEN="$(oidc-token egi-checkin)" \n\n \
-If running from VScode make sure to launch `code` from that terminal so it can access \
-that ENV variable.'
-    )
-
 # List tools
 tools_list = list(Tools.get_items().keys())
 
@@ -48,10 +36,11 @@ assert isinstance(tools_sum[0], dict)
 tools_tags = Tools.get_tags()
 assert isinstance(tools_tags, list)  # empty list; deprecated method
 
+
 # Explore individual tools
 # Contrary than for modules, we do this for all tools because tool configurations are
 # particular for each tool
-for tool_name in tools_list:
+def check_tool(tool_name):
     print(f"  - Testing {tool_name}")
 
     # Get tool config
@@ -69,10 +58,16 @@ for tool_name in tools_list:
     assert isinstance(tool_meta, dict)
     assert "title" in tool_meta.keys()
 
+
+# Tools are checked concurrently (each check makes network calls), consuming the
+# results so that failed assertions are raised here
+with ThreadPoolExecutor(max_workers=8) as executor:
+    list(executor.map(check_tool, tools_list))
+
 # Refresh metadata cache
 common.JENKINS_TOKEN = "1234"
 module_meta = Tools.refresh_metadata_cache_entry(
-    item_name=tool_name,
+    item_name=tools_list[-1],
     authorization=SimpleNamespace(
         credentials="1234",
     ),
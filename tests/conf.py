@@ -0,0 +1,22 @@
+"""
+Shared credentials for the tests
+"""
+
+import os
+from types import SimpleNamespace
+
+
+# Retrieve EGI token (not generated on the fly in case the are rate limiting issues
+# if too many queries)
+token = os.getenv("TMP_EGI_TOKEN")
+if not token:
+    raise Exception(
+        'Please remember to set a token as ENV variable before executing \
+the tests! \n\n \
+   export TMP_EGI_TOKEN="$(oidc-token egi-checkin)" \n\n \
+If running from VScode make sure to launch `code` from that terminal so it can access \
+that ENV variable.'
+    )
+
+# Credentials shared by all the tests
+AUTH = SimpleNamespace(credentials=token)
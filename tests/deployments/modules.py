@@ -1,39 +1,41 @@
-import os
-import time
 from types import SimpleNamespace
 
+from fastapi import HTTPException
+
 from ai4papi.routers.v1.deployments import modules
 from ai4papi.routers.v1.deployments import tools
+from conf import AUTH
+from polling import wait_until
 
 
-# Retrieve EGI token (not generated on the fly in case the are rate limiting issues
-# if too many queries)
-token = os.getenv("TMP_EGI_TOKEN")
-if not token:
-    raise Exception(
-        'Please remember to set a token as ENV variable before executing \
-the tests! \n\n \
-   export TMP_EGI_TOKEN="$(oidc-token egi-checkin)" \n\n \
-If running from VScode make sure to launch `code` from that terminal so it can access \
-that ENV variable.'
-    )
-
 # Create module
 rcreate = modules.create_deployment(
     vo="vo.ai4eosc.eu",
     conf={},
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rcreate, dict)
 assert "job_ID" in rcreate.keys()
 
-time.sleep(0.2)  # Nomad takes some time to allocate deployment
+# Nomad takes some time to allocate deployment
+allocated = wait_until(
+    lambda: (
+        modules.get_deployment(
+            vo="vo.ai4eosc.eu",
+            deployment_uuid=rcreate["job_ID"],
+            full_info=False,
+            authorization=AUTH,
+        )["status"]
+        not in ("queued", "error")
+    )
+)
+assert allocated, "Deployment was not allocated"
 
 # Retrieve that module
 rdep = modules.get_deployment(
     vo="vo.ai4eosc.eu",
     deployment_uuid=rcreate["job_ID"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdep, dict)
 assert "job_ID" in rdep.keys()
@@ -43,47 +45,52 @@ assert rdep["status"] != "error"
 # Retrieve all modules
 rdeps = modules.get_deployments(
     vos=["vo.ai4eosc.eu"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdeps, list)
-assert any([d["job_ID"] == rcreate["job_ID"] for d in rdeps])
-assert all([d["job_ID"] != "error" for d in rdeps])
+assert any(d["job_ID"] == rcreate["job_ID"] for d in rdeps)
+assert all(d["job_ID"] != "error" for d in rdeps)
 
 # Check that we cannot retrieve that module from tools
-# This should break!
-# tools.get_deployment(
-#     vo='vo.ai4eosc.eu',
-#     deployment_uuid=rcreate['job_ID'],
-#     authorization=SimpleNamespace(
-#         credentials=token
-#     ),
-# )
+try:
+    tools.get_deployment(
+        vo="vo.ai4eosc.eu",
+        deployment_uuid=rcreate["job_ID"],
+        full_info=False,
+        authorization=AUTH,
+    )
+except HTTPException as e:
+    assert e.status_code == 400
+else:
+    raise AssertionError("Module was retrieved as a tool")
 
 # Check that we cannot retrieve that module from tools list
 rdeps2 = tools.get_deployments(
     vos=["vo.ai4eosc.eu"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdeps2, list)
-assert not any([d["job_ID"] == rcreate["job_ID"] for d in rdeps2])
+assert not any(d["job_ID"] == rcreate["job_ID"] for d in rdeps2)
 
 # Delete module
 rdel = modules.delete_deployment(
     vo="vo.ai4eosc.eu",
     deployment_uuid=rcreate["job_ID"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdel, dict)
 assert "status" in rdel.keys()
 
-time.sleep(3)  # Nomad takes some time to delete
-
-# Check module no longer exists
-rdeps3 = modules.get_deployments(
-    vos=["vo.ai4eosc.eu"],
-    authorization=SimpleNamespace(credentials=token),
+# Check module no longer exists (Nomad takes some time to delete)
+deleted = wait_until(
+    lambda: (
+        not any(
+            d["job_ID"] == rcreate["job_ID"]
+            for d in modules.get_deployments(vos=["vo.ai4eosc.eu"], authorization=AUTH)
+        )
+    )
 )
-assert not any([d["job_ID"] == rcreate["job_ID"] for d in rdeps3])
+assert deleted, "Module still exists"
 
 # Check that we are able to retrieve info from Nomad snapshots (provenance)
 modules.provenance_token = "1234"
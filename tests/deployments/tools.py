@@ -1,23 +1,11 @@
-import os
-import time
-from types import SimpleNamespace
+from fastapi import HTTPException
 
 from ai4papi.routers.v1.deployments import modules
 from ai4papi.routers.v1.deployments import tools
+from conf import AUTH
+from polling import wait_until
 
 
-# Retrieve EGI token (not generated on the fly in case the are rate limiting issues
-# if too many queries)
-token = os.getenv("TMP_EGI_TOKEN")
-if not token:
-    raise Exception(
-        'Please remember to set a token as ENV variable before executing \
-the tests! \n\n \
-   export TMP_EGI_TOKEN="$(oidc-token egi-checkin)" \n\n \
-If running from VScode make sure to launch `code` from that terminal so it can access \
-that ENV variable.'
-    )
-
 print("  Testing FL server")
 
 # Create tool
@@ -25,18 +13,30 @@ rcreate = tools.create_deployment(
     vo="vo.ai4eosc.eu",
     tool_name="ai4os-federated-server",
     conf={},
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rcreate, dict)
 assert "job_ID" in rcreate.keys()
 
-time.sleep(0.2)  # Nomad takes some time to allocate deployment
+# Nomad takes some time to allocate deployment
+allocated = wait_until(
+    lambda: (
+        tools.get_deployment(
+            vo="vo.ai4eosc.eu",
+            deployment_uuid=rcreate["job_ID"],
+            full_info=False,
+            authorization=AUTH,
+        )["status"]
+        not in ("queued", "error")
+    )
+)
+assert allocated, "Deployment was not allocated"
 
 # Retrieve that tool
 rdep = tools.get_deployment(
     vo="vo.ai4eosc.eu",
     deployment_uuid=rcreate["job_ID"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdep, dict)
 assert "job_ID" in rdep.keys()
@@ -46,47 +46,52 @@ assert rdep["status"] != "error"
 # Retrieve all tools
 rdeps = tools.get_deployments(
     vos=["vo.ai4eosc.eu"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdeps, list)
-assert any([d["job_ID"] == rcreate["job_ID"] for d in rdeps])
-assert all([d["job_ID"] != "error" for d in rdeps])
+assert any(d["job_ID"] == rcreate["job_ID"] for d in rdeps)
+assert all(d["job_ID"] != "error" for d in rdeps)
 
 # Check that we cannot retrieve that tool from modules
-# This should break!
-# modules.get_deployment(
-#     vo='vo.ai4eosc.eu',
-#     deployment_uuid=rcreate['job_ID'],
-#     authorization=SimpleNamespace(
-#         credentials=token
-#     ),
-# )
+try:
+    modules.get_deployment(
+        vo="vo.ai4eosc.eu",
+        deployment_uuid=rcreate["job_ID"],
+        full_info=False,
+        authorization=AUTH,
+    )
+except HTTPException as e:
+    assert e.status_code == 400
+else:
+    raise AssertionError("Tool was retrieved as a module")
 
 # Check that we cannot retrieve that tool from modules list
 rdeps2 = modules.get_deployments(
     vos=["vo.ai4eosc.eu"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdeps2, list)
-assert not any([d["job_ID"] == rcreate["job_ID"] for d in rdeps2])
+assert not any(d["job_ID"] == rcreate["job_ID"] for d in rdeps2)
 
 # Delete tool
 rdel = tools.delete_deployment(
     vo="vo.ai4eosc.eu",
     deployment_uuid=rcreate["job_ID"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdel, dict)
 assert "status" in rdel.keys()
 
-time.sleep(3)  # Nomad takes some time to delete
-
-# Check tool no longer exists
-rdeps3 = tools.get_deployments(
-    vos=["vo.ai4eosc.eu"],
-    authorization=SimpleNamespace(credentials=token),
+# Check tool no longer exists (Nomad takes some time to delete)
+deleted = wait_until(
+    lambda: (
+        not any(
+            d["job_ID"] == rcreate["job_ID"]
+            for d in tools.get_deployments(vos=["vo.ai4eosc.eu"], authorization=AUTH)
+        )
+    )
 )
-assert not any([d["job_ID"] == rcreate["job_ID"] for d in rdeps3])
+assert deleted, "Tool still exists"
 
 ############################################################
 # Additionally test simply the creation of the other tools #
@@ -112,19 +117,31 @@ rcreate = tools.create_deployment(
             "rclone_password": "mock_password",
         },
     },
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rcreate, dict)
 assert "job_ID" in rcreate.keys()
 assert rdep["status"] != "error"
 
-time.sleep(0.2)  # Nomad takes some time to allocate deployment
+# Nomad takes some time to allocate deployment
+allocated = wait_until(
+    lambda: (
+        tools.get_deployment(
+            vo="vo.ai4eosc.eu",
+            deployment_uuid=rcreate["job_ID"],
+            full_info=False,
+            authorization=AUTH,
+        )["status"]
+        not in ("queued", "error")
+    )
+)
+assert allocated, "Deployment was not allocated"
 
 # Delete tool
 rdel = tools.delete_deployment(
     vo="vo.ai4eosc.eu",
     deployment_uuid=rcreate["job_ID"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdel, dict)
 assert "status" in rdel.keys()
@@ -142,19 +159,31 @@ rcreate = tools.create_deployment(
             "model_id": "happy-elephant",
         },
     },
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rcreate, dict)
 assert "job_ID" in rcreate.keys()
 assert rdep["status"] != "error"
 
-time.sleep(0.2)  # Nomad takes some time to allocate deployment
+# Nomad takes some time to allocate deployment
+allocated = wait_until(
+    lambda: (
+        tools.get_deployment(
+            vo="vo.ai4eosc.eu",
+            deployment_uuid=rcreate["job_ID"],
+            full_info=False,
+            authorization=AUTH,
+        )["status"]
+        not in ("queued", "error")
+    )
+)
+assert allocated, "Deployment was not allocated"
 
 # Delete tool
 rdel = tools.delete_deployment(
     vo="vo.ai4eosc.eu",
     deployment_uuid=rcreate["job_ID"],
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 assert isinstance(rdel, dict)
 assert "status" in rdel.keys()
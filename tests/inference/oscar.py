@@ -1,19 +1,6 @@
-import os
-from types import SimpleNamespace
-
 from ai4papi.routers.v1.inference import oscar
+from conf import AUTH
 
-# Retrieve EGI token (not generated on the fly in case the are rate limitng issues
-# if too many queries)
-token = os.getenv("TMP_EGI_TOKEN")
-if not token:
-    raise Exception(
-        'Please remember to set a token as ENV variable before executing \
-the tests! \n\n \
-   export TMP_EGI_TOKEN="$(oidc-token egi-checkin-demo)" \n\n \
-If running from VScode make sure to launch `code` from that terminal so it can access \
-that ENV variable.'
-    )
 
 # Test service
 service = oscar.Service(
@@ -25,15 +12,15 @@ service = oscar.Service(
 sname = oscar.create_service(
     vo="vo.ai4eosc.eu",
     svc_conf=service,
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 
 # Check service exists
 slist = oscar.get_services_list(
     vo="vo.ai4eosc.eu",
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
-names = [s["name"] for s in slist]
+names = {s["name"] for s in slist}
 assert sname in names, "Service does not exist"
 
 # Update service
@@ -42,22 +29,22 @@ oscar.update_service(
     vo="vo.ai4eosc.eu",
     service_name=sname,
     svc_conf=service,
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 
 # Delete the service
 oscar.delete_service(
     vo="vo.ai4eosc.eu",
     service_name=sname,
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
 
 # Check service does not longer exist
 slist = oscar.get_services_list(
     vo="vo.ai4eosc.eu",
-    authorization=SimpleNamespace(credentials=token),
+    authorization=AUTH,
 )
-names = [s["name"] for s in slist]
+names = {s["name"] for s in slist}
 assert sname not in names, "Service exists"
 
 print("Inference (OSCAR) tests passed!")
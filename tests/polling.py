@@ -0,0 +1,23 @@
+"""
+Polling helpers for the tests (no credentials needed)
+"""
+
+import time
+
+
+def wait_until(condition, timeout=10, start=0.05, max_interval=1):
+    """
+    Poll `condition()` with exponential backoff until it is True or `timeout`
+    (seconds) has passed. Returns the last value of the condition.
+
+    This is used instead of fixed sleeps to wait for Nomad to (de)allocate jobs, so
+    that tests do not wait longer than needed.
+    """
+    deadline = time.monotonic() + timeout
+    interval = start
+    while True:
+        ok = condition()
+        if ok or time.monotonic() >= deadline:
+            return ok
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
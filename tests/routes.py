@@ -5,46 +5,61 @@ Test FastAPI is correctly generating the routes
 from ai4papi.main import app
 
 
-# Check routes
-routes = [(r.path, r.methods) for r in app.routes]
-
-for collection in ["modules", "tools"]:
-    assert (f"/v1/catalog/{collection}", {"GET"}) in routes
-    assert (f"/v1/catalog/{collection}/detail", {"GET"}) in routes
-    assert (f"/v1/catalog/{collection}/tags", {"GET"}) in routes
-    assert (f"/v1/catalog/{collection}/" + "{item_name}/config", {"GET"}) in routes
-    assert (f"/v1/catalog/{collection}/" + "{item_name}/metadata", {"GET"}) in routes
-
-    assert (f"/v1/deployments/{collection}", {"GET"}) in routes
-    assert (f"/v1/deployments/{collection}", {"POST"}) in routes
-    assert (f"/v1/deployments/{collection}/" + "{deployment_uuid}", {"GET"}) in routes
-    assert (
-        f"/v1/deployments/{collection}/" + "{deployment_uuid}",
-        {"DELETE"},
-    ) in routes
-
-
-assert ("/v1/datasets/zenodo", {"POST"}) in routes
+# Routes that PAPI must expose, as (path, method) pairs
+EXPECTED_ROUTES = frozenset(
+    {
+        # Modules
+        ("/v1/catalog/modules", "GET"),
+        ("/v1/catalog/modules/detail", "GET"),
+        ("/v1/catalog/modules/tags", "GET"),
+        ("/v1/catalog/modules/{item_name}/config", "GET"),
+        ("/v1/catalog/modules/{item_name}/metadata", "GET"),
+        ("/v1/deployments/modules", "GET"),
+        ("/v1/deployments/modules", "POST"),
+        ("/v1/deployments/modules/{deployment_uuid}", "GET"),
+        ("/v1/deployments/modules/{deployment_uuid}", "DELETE"),
+        # Tools
+        ("/v1/catalog/tools", "GET"),
+        ("/v1/catalog/tools/detail", "GET"),
+        ("/v1/catalog/tools/tags", "GET"),
+        ("/v1/catalog/tools/{item_name}/config", "GET"),
+        ("/v1/catalog/tools/{item_name}/metadata", "GET"),
+        ("/v1/deployments/tools", "GET"),
+        ("/v1/deployments/tools", "POST"),
+        ("/v1/deployments/tools/{deployment_uuid}", "GET"),
+        ("/v1/deployments/tools/{deployment_uuid}", "DELETE"),
+        # Datasets
+        ("/v1/datasets/zenodo", "POST"),
+        # Inference
+        ("/v1/inference/oscar/cluster", "GET"),
+        ("/v1/inference/oscar/services", "GET"),
+        ("/v1/inference/oscar/services", "POST"),
+        ("/v1/inference/oscar/services/{service_name}", "GET"),
+        ("/v1/inference/oscar/services/{service_name}", "PUT"),
+        ("/v1/inference/oscar/services/{service_name}", "DELETE"),
+        # Secrets
+        ("/v1/secrets", "GET"),
+        ("/v1/secrets", "POST"),
+        ("/v1/secrets", "DELETE"),
+        # Stats
+        ("/v1/deployments/stats/user", "GET"),
+        ("/v1/deployments/stats/cluster", "GET"),
+        # Try me
+        ("/v1/try_me/nomad", "POST"),
+        ("/v1/try_me/nomad", "GET"),
+        ("/v1/try_me/nomad/{deployment_uuid}", "GET"),
+        ("/v1/try_me/nomad/{deployment_uuid}", "DELETE"),
+        # Storage
+        ("/v1/storage/{storage_name}/ls", "GET"),
+    }
+)
 
-assert ("/v1/inference/oscar/cluster", {"GET"}) in routes
-assert ("/v1/inference/oscar/services", {"GET"}) in routes
-assert ("/v1/inference/oscar/services", {"POST"}) in routes
-assert ("/v1/inference/oscar/services/{service_name}", {"GET"}) in routes
-assert ("/v1/inference/oscar/services/{service_name}", {"PUT"}) in routes
-assert ("/v1/inference/oscar/services/{service_name}", {"DELETE"}) in routes
-
-assert ("/v1/secrets", {"GET"}) in routes
-assert ("/v1/secrets", {"POST"}) in routes
-assert ("/v1/secrets", {"DELETE"}) in routes
-
-assert ("/v1/deployments/stats/user", {"GET"}) in routes
-assert ("/v1/deployments/stats/cluster", {"GET"}) in routes
-
-assert ("/v1/try_me/nomad", {"POST"}) in routes
-assert ("/v1/try_me/nomad", {"GET"}) in routes
-assert ("/v1/try_me/nomad/{deployment_uuid}", {"GET"}) in routes
-assert ("/v1/try_me/nomad/{deployment_uuid}", {"DELETE"}) in routes
+# Check routes
+# (use a set of hashable tuples, so that we can check all routes at once)
+routes = {(r.path, frozenset(r.methods)) for r in app.routes}
 
-assert ("/v1/storage/{storage_name}/ls", {"GET"}) in routes
+expected = {(path, frozenset({method})) for path, method in EXPECTED_ROUTES}
+missing = expected - routes
+assert not missing, f"Missing routes: {sorted(missing)}"
 
 print("Checks for API routes passed!")
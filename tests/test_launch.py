@@ -6,8 +6,23 @@ package error).
 """
 
 import subprocess
+
 import requests
-import time
+
+from polling import wait_until
+
+
+def is_ready():
+    """
+    Check if PAPI is up and answering.
+    """
+    if server_process.poll() is not None:
+        raise Exception("PAPI exited during startup")
+    try:
+        return requests.get("http://0.0.0.0:8080", timeout=1).status_code == 200
+    except requests.exceptions.RequestException:
+        # Not listening yet, or too slow to answer while starting
+        return False
 
 
 server_process = subprocess.Popen(
@@ -15,13 +30,11 @@ server_process = subprocess.Popen(
     stdout=subprocess.DEVNULL,
     stderr=subprocess.DEVNULL,
 )
-time.sleep(15)  # wait for PAPI to start
 
 try:
-    response = requests.get("http://0.0.0.0:8080")
-    assert response.status_code == 200, "PAPI status code is not 200"
-except requests.exceptions.ConnectionError:
-    raise Exception("Failed to connect to the server")
+    # Poll until PAPI has started, instead of waiting a fixed amount of time
+    ready = wait_until(is_ready, timeout=30, start=0.25)
+    assert ready, "PAPI did not start (or status code is not 200) after 30 seconds"
 finally:
     server_process.kill()
 